@@ -5,19 +5,90 @@ A super simple FastAPI application that allows students to view and sign up
 for extracurricular activities at Mergington High School.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
-import os
+from fastapi.responses import JSONResponse, RedirectResponse, Response
+import asyncio
+import hashlib
+import mimetypes
+import orjson
+import sys
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field, replace
 from pathlib import Path
+from typing import Annotated, Any, Literal
+from pydantic import BaseModel, EmailStr, TypeAdapter, ValidationError
+
+
+def _orjson_default(obj: Any):
+    """Serialize types orjson does not handle natively"""
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default)
+
 
 app = FastAPI(title="Mergington High School API",
-              description="API for viewing and signing up for extracurricular activities")
+              description="API for viewing and signing up for extracurricular activities",
+              default_response_class=OrjsonResponse)
+
+# Compress larger responses such as the /activities payload
+app.add_middleware(GZipMiddleware, minimum_size=512)
 
-# Mount the static files directory
+# Static files directory
 current_dir = Path(__file__).parent
-app.mount("/static", StaticFiles(directory=os.path.join(Path(__file__).parent,
-          "static")), name="static")
+static_dir = current_dir / "static"
+
+# Fallback for static files that were not preloaded into the cache
+_static_files = StaticFiles(directory=static_dir)
+
+
+def _load_static_cache():
+    """Read every static file into memory with its media type and ETag"""
+    cache = {}
+    for file_path in static_dir.rglob("*"):
+        if not file_path.is_file():
+            continue
+        data = file_path.read_bytes()
+        media_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+        # Weak, since GZipMiddleware may send a different body for the same file
+        etag = 'W/"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"'
+        cache[file_path.relative_to(static_dir).as_posix()] = (data, media_type, etag)
+    return cache
+
+
+# Static file path -> (content, media type, ETag)
+_static_cache = _load_static_cache()
+
+
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def get_static_file(path: str, request: Request):
+    """Serve a static file from memory, answering 304 when the ETag matches"""
+    if path not in _static_cache:
+        return await _static_files.get_response(path, request.scope)
+
+    data, media_type, etag = _static_cache[path]
+    # Bodiless responses skip GZipMiddleware, so state the Vary header it would
+    # add to the GET ourselves and keep caches keyed the same way
+    bodiless_headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+
+    # If-None-Match uses weak comparison, so ignore any W/ prefix; "*" matches
+    # any current representation
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers=bodiless_headers)
+    if request.method == "HEAD":
+        return Response(media_type=media_type,
+                        headers={**bodiless_headers, "Content-Length": str(len(data))})
+    return Response(content=data, media_type=media_type, headers={"ETag": etag})
 
 # Activity categories
 activity_categories = {
@@ -33,106 +104,243 @@ activity_categories = {
     "Book Club": "Arts"
 }
 
+
+@dataclass(slots=True)
+class Activity:
+    """An extracurricular activity and the students enrolled in it"""
+    description: str
+    schedule: str
+    max_participants: int
+    participants: set[str] = field(default_factory=set)
+
+
 # In-memory activity database
-activities = {
-    "Chess Club": {
-        "description": "Learn strategies and compete in chess tournaments",
-        "schedule": "Fridays, 3:30 PM - 5:00 PM",
-        "max_participants": 12,
-        "participants": ["michael@mergington.edu", "daniel@mergington.edu"]
-    },
-    "Programming Class": {
-        "description": "Learn programming fundamentals and build software projects",
-        "schedule": "Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
-        "max_participants": 20,
-        "participants": ["emma@mergington.edu", "sophia@mergington.edu"]
-    },
-    "Gym Class": {
-        "description": "Physical education and sports activities",
-        "schedule": "Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
-        "max_participants": 30,
-        "participants": ["john@mergington.edu", "olivia@mergington.edu"]
-    },
-    "Soccer Team": {
-        "description": "Join the varsity soccer team and compete against other schools",
-        "schedule": "Mondays and Wednesdays, 4:00 PM - 6:00 PM",
-        "max_participants": 25,
-        "participants": ["lucas@mergington.edu", "mia@mergington.edu"]
-    },
-    "Swimming Club": {
-        "description": "Practice swimming techniques and compete in swim meets",
-        "schedule": "Tuesdays and Thursdays, 4:00 PM - 5:30 PM",
-        "max_participants": 15,
-        "participants": ["ethan@mergington.edu", "ava@mergington.edu"]
-    },
-    "Art Club": {
-        "description": "Explore various art mediums including painting, drawing, and sculpture",
-        "schedule": "Thursdays, 3:30 PM - 5:00 PM",
-        "max_participants": 18,
-        "participants": ["lily@mergington.edu", "noah@mergington.edu"]
-    },
-    "Drama Club": {
-        "description": "Participate in theater productions and improve acting skills",
-        "schedule": "Wednesdays and Fridays, 3:30 PM - 5:30 PM",
-        "max_participants": 22,
-        "participants": ["isabella@mergington.edu", "james@mergington.edu"]
-    },
-    "Debate Team": {
-        "description": "Develop critical thinking and public speaking through competitive debates",
-        "schedule": "Tuesdays, 4:00 PM - 5:30 PM",
-        "max_participants": 16,
-        "participants": ["alexander@mergington.edu", "charlotte@mergington.edu"]
-    },
-    "Science Olympiad": {
-        "description": "Compete in science and engineering challenges at regional competitions",
-        "schedule": "Mondays and Thursdays, 3:30 PM - 5:00 PM",
-        "max_participants": 20,
-        "participants": ["william@mergington.edu", "amelia@mergington.edu"]
-    },
-    "Book Club": {
-        "description": "Read and discuss classic and contemporary literature",
-        "schedule": "Fridays, 3:00 PM - 4:30 PM",
-        "max_participants": 15,
-        "participants": []
+activities: dict[str, Activity] = {
+    "Chess Club": Activity(
+        description="Learn strategies and compete in chess tournaments",
+        schedule="Fridays, 3:30 PM - 5:00 PM",
+        max_participants=12,
+        participants={"michael@mergington.edu", "daniel@mergington.edu"}
+    ),
+    "Programming Class": Activity(
+        description="Learn programming fundamentals and build software projects",
+        schedule="Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
+        max_participants=20,
+        participants={"emma@mergington.edu", "sophia@mergington.edu"}
+    ),
+    "Gym Class": Activity(
+        description="Physical education and sports activities",
+        schedule="Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
+        max_participants=30,
+        participants={"john@mergington.edu", "olivia@mergington.edu"}
+    ),
+    "Soccer Team": Activity(
+        description="Join the varsity soccer team and compete against other schools",
+        schedule="Mondays and Wednesdays, 4:00 PM - 6:00 PM",
+        max_participants=25,
+        participants={"lucas@mergington.edu", "mia@mergington.edu"}
+    ),
+    "Swimming Club": Activity(
+        description="Practice swimming techniques and compete in swim meets",
+        schedule="Tuesdays and Thursdays, 4:00 PM - 5:30 PM",
+        max_participants=15,
+        participants={"ethan@mergington.edu", "ava@mergington.edu"}
+    ),
+    "Art Club": Activity(
+        description="Explore various art mediums including painting, drawing, and sculpture",
+        schedule="Thursdays, 3:30 PM - 5:00 PM",
+        max_participants=18,
+        participants={"lily@mergington.edu", "noah@mergington.edu"}
+    ),
+    "Drama Club": Activity(
+        description="Participate in theater productions and improve acting skills",
+        schedule="Wednesdays and Fridays, 3:30 PM - 5:30 PM",
+        max_participants=22,
+        participants={"isabella@mergington.edu", "james@mergington.edu"}
+    ),
+    "Debate Team": Activity(
+        description="Develop critical thinking and public speaking through competitive debates",
+        schedule="Tuesdays, 4:00 PM - 5:30 PM",
+        max_participants=16,
+        participants={"alexander@mergington.edu", "charlotte@mergington.edu"}
+    ),
+    "Science Olympiad": Activity(
+        description="Compete in science and engineering challenges at regional competitions",
+        schedule="Mondays and Thursdays, 3:30 PM - 5:00 PM",
+        max_participants=20,
+        participants={"william@mergington.edu", "amelia@mergington.edu"}
+    ),
+    "Book Club": Activity(
+        description="Read and discuss classic and contemporary literature",
+        schedule="Fridays, 3:00 PM - 4:30 PM",
+        max_participants=15,
+        participants=set()
+    )
+}
+
+def _intern_activities(activities_data: dict[str, Activity]) -> dict[str, Activity]:
+    """Return a copy of the activities with interned names and participant emails"""
+    return {
+        sys.intern(name): replace(activity, participants={sys.intern(email) for email in activity.participants})
+        for name, activity in activities_data.items()
     }
+
+
+# Intern activity names and emails so lookups with interned request values
+# compare by identity before falling back to a full string comparison
+activity_categories = {sys.intern(name): category for name, category in activity_categories.items()}
+activities = _intern_activities(activities)
+
+# Known activity names, validated by FastAPI before the handlers run
+ActivityName = Literal[tuple(activities)]
+
+# Reverse index: student email -> names of the activities they are enrolled in
+student_index: dict[str, set[str]] = defaultdict(set)
+
+# Per-student count of enrolled activities in each category
+student_categories: dict[str, Counter[str]] = defaultdict(Counter)
+
+# Category -> names of the activities in that category
+category_activities: dict[str, frozenset[str]] = {
+    category: frozenset(name for name, c in activity_categories.items() if c == category)
+    for category in set(activity_categories.values())
 }
 
+# Per-student set of activities they may not sign up for, kept current on
+# every enrollment change so signup validation is a single lookup
+_disallowed: dict[str, frozenset[str]] = {}
+
+# Number of participants currently enrolled in each activity
+participants_count: dict[str, int] = {}
+
+# Student email -> bit position used in the participant bitmasks
+_email_ids: dict[str, int] = {}
+
+# Activity name -> bitmask of participant ids, for fast set operations
+participants_mask: dict[str, int] = {}
+
+# Pre-rendered JSON for GET /activities, cleared whenever participants change
+_activities_cache: bytes | None = None
+
+
+# Serializes check-then-mutate sequences on the participant data
+_signup_lock = asyncio.Lock()
+
+
+def _refresh_disallowed(email: str):
+    """Recompute the activities a student is not allowed to sign up for"""
+    if len(student_index[email]) >= 3:
+        _disallowed[email] = frozenset(activities)
+        return
+    blocked = set()
+    for category in student_categories[email]:
+        blocked |= category_activities[category]
+    _disallowed[email] = frozenset(blocked)
+
+
+def _email_bit(email: str) -> int:
+    """Return the bitmask bit assigned to a student, allocating one if needed"""
+    return 1 << _email_ids.setdefault(email, len(_email_ids))
+
+
+def _rebuild_indexes():
+    """Rebuild the per-student lookup tables from the activities database"""
+    global _activities_cache
+    _activities_cache = None
+    student_index.clear()
+    student_categories.clear()
+    participants_count.clear()
+    _disallowed.clear()
+    _email_ids.clear()
+    participants_mask.clear()
+    for activity_name, activity_data in activities.items():
+        category = activity_categories[activity_name]
+        participants_count[activity_name] = len(activity_data.participants)
+        participants_mask[activity_name] = 0
+        for email in activity_data.participants:
+            participants_mask[activity_name] |= _email_bit(email)
+            student_index[email].add(activity_name)
+            student_categories[email][category] += 1
+    for email in student_index:
+        _refresh_disallowed(email)
+
+
+_rebuild_indexes()
+
+
+# The landing redirect never varies, so build it once and reuse it
+_ROOT_REDIRECT = RedirectResponse(url="/static/index.html")
+
 
 @app.get("/")
 def root():
-    return RedirectResponse(url="/static/index.html")
+    return _ROOT_REDIRECT
+
+
+def _render_activities() -> bytes:
+    """Return the cached JSON body for GET /activities, rendering it if needed"""
+    global _activities_cache
+    if _activities_cache is None:
+        _activities_cache = orjson.dumps(activities, default=_orjson_default)
+    return _activities_cache
 
 
 @app.get("/activities")
 def get_activities():
-    return activities
+    return Response(content=_render_activities(), media_type="application/json")
+
+
+@app.get("/activities/overlap")
+def get_activities_overlap(a: ActivityName, b: ActivityName):
+    """Count the students enrolled in both of two activities"""
+    overlap = participants_mask[a] & participants_mask[b]
+    return {"a": a, "b": b, "overlap": overlap.bit_count()}
 
 
 def get_student_activities(email: str):
     """Get all activities a student is enrolled in"""
-    enrolled_activities = []
-    for activity_name, activity_data in activities.items():
-        if email in activity_data["participants"]:
-            enrolled_activities.append(activity_name)
-    return enrolled_activities
+    return list(student_index.get(email, ()))
 
 
-@app.post("/activities/{activity_name}/signup")
-def signup_for_activity(activity_name: str, email: str):
-    """Sign up a student for an activity"""
-    # Validate activity exists
-    if activity_name not in activities:
-        raise HTTPException(status_code=404, detail="Activity not found")
+def student_has_activity_in_category(email: str, category: str) -> bool:
+    """Check whether a student is enrolled in any activity of a category"""
+    return category in student_categories.get(email, ())
+
+
+# Validates and normalizes batch emails exactly like EmailStr query parameters
+_email_adapter = TypeAdapter(EmailStr)
+
+
+def _normalize_email(email: str) -> str | None:
+    """Return the normalized, interned form of an email, or None if invalid"""
+    try:
+        return sys.intern(_email_adapter.validate_python(email))
+    except ValidationError:
+        return None
+
+
+class SignupItem(BaseModel):
+    """A single signup in a batch request"""
+    activity_name: str
+    email: str
+
+
+def _first_same_category(email: str, category: str):
+    """Return the first activity the student is enrolled in for a category, if any"""
+    for activity_name in student_index.get(email, ()):
+        if activity_categories[activity_name] == category:
+            return activity_name
+    return None
 
-    # Get the specific activity
-    activity = activities[activity_name]
 
+def _check_signup_conflicts(activity_name: str, email: str):
+    """Raise the error explaining why a disallowed signup is rejected"""
     # Validate student is not already signed up
-    if email in activity["participants"]:
+    if email in activities[activity_name].participants:
         raise HTTPException(status_code=400, detail="Student already signed up for this activity")
     
     # Check if student is enrolled in 3 or more activities
-    enrolled_activities = get_student_activities(email)
+    enrolled_activities = student_index[email]
     if len(enrolled_activities) >= 3:
         raise HTTPException(
             status_code=400, 
@@ -141,22 +349,88 @@ def signup_for_activity(activity_name: str, email: str):
     
     # Check if student is already enrolled in an activity of the same category
     new_category = activity_categories[activity_name]
-    for enrolled_activity in enrolled_activities:
-        enrolled_category = activity_categories[enrolled_activity]
-        if enrolled_category == new_category:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Student is already enrolled in '{enrolled_activity}' which is in the same category ({new_category}). Cannot enroll in multiple programs of the same type."
-            )
-    
+    if student_has_activity_in_category(email, new_category):
+        enrolled_activity = _first_same_category(email, new_category)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Student is already enrolled in '{enrolled_activity}' which is in the same category ({new_category}). Cannot enroll in multiple programs of the same type."
+        )
+
+
+def _do_signup(activity_name: str, email: str):
+    """Validate and apply a signup, keeping all lookup tables in sync
+
+    The email must already be validated, normalized and interned.
+    """
+    global _activities_cache
+    activity_name = sys.intern(activity_name)
+
+    # Validate activity exists (batch items are not checked by FastAPI)
+    if activity_name not in activities:
+        raise HTTPException(status_code=404, detail="Activity not found")
+
+    # Get the specific activity
+    activity = activities[activity_name]
+
+    # Only students whose enrollments rule out this activity need the
+    # detailed checks
+    if activity_name in _disallowed.get(email, ()):
+        _check_signup_conflicts(activity_name, email)
+
+    # Validate the activity has room left
+    if participants_count[activity_name] >= activity.max_participants:
+        raise HTTPException(status_code=400, detail="Activity full")
+
     # Add student
-    activity["participants"].append(email)
+    activity.participants.add(email)
+    participants_count[activity_name] += 1
+    participants_mask[activity_name] |= _email_bit(email)
+    student_index[email].add(activity_name)
+    student_categories[email][activity_categories[activity_name]] += 1
+    _refresh_disallowed(email)
+    _activities_cache = None
     return {"message": f"Signed up {email} for {activity_name}"}
 
 
-@app.delete("/activities/{activity_name}/remove")
-def remove_from_activity(activity_name: str, email: str):
-    """Remove a participant from an activity"""
+@app.post("/activities/{activity_name}/signup")
+async def signup_for_activity(activity_name: ActivityName, email: EmailStr):
+    """Sign up a student for an activity"""
+    async with _signup_lock:
+        return _do_signup(activity_name, sys.intern(email))
+
+
+# Largest batch accepted, since a batch holds the signup lock while it runs
+MAX_BATCH_SIZE = 100
+
+
+@app.post("/activities/signup/batch", status_code=207)
+async def batch_signup(items: Annotated[list[SignupItem], Body(max_length=MAX_BATCH_SIZE)]):
+    """Sign up several students at once, reporting the result of each item"""
+    # Batch emails are plain strings, so validate them before taking the lock
+    emails = [_normalize_email(item.email) for item in items]
+
+    results = []
+    async with _signup_lock:
+        for index, (item, email) in enumerate(zip(items, emails)):
+            if email is None:
+                results.append({"index": index, "ok": False, "detail": "Invalid email address"})
+                continue
+            try:
+                result = _do_signup(item.activity_name, email)
+                results.append({"index": index, "ok": True, "detail": result["message"]})
+            except HTTPException as exc:
+                results.append({"index": index, "ok": False, "detail": exc.detail})
+    return results
+
+
+def _do_remove(activity_name: str, email: str):
+    """Validate and apply a removal, keeping all lookup tables in sync
+
+    The email must already be validated, normalized and interned.
+    """
+    global _activities_cache
+    activity_name = sys.intern(activity_name)
+
     # Validate activity exists
     if activity_name not in activities:
         raise HTTPException(status_code=404, detail="Activity not found")
@@ -165,22 +439,54 @@ def remove_from_activity(activity_name: str, email: str):
     activity = activities[activity_name]
 
     # Validate student is signed up
-    if email not in activity["participants"]:
+    if email not in activity.participants:
         raise HTTPException(status_code=400, detail="Student is not signed up for this activity")
     
     # Remove student
-    activity["participants"].remove(email)
+    activity.participants.discard(email)
+    participants_count[activity_name] -= 1
+    participants_mask[activity_name] &= ~_email_bit(email)
+    student_index[email].discard(activity_name)
+    categories = student_categories[email]
+    category = activity_categories[activity_name]
+    categories[category] -= 1
+    if categories[category] <= 0:
+        del categories[category]
+    _refresh_disallowed(email)
+    _activities_cache = None
     return {"message": f"Removed {email} from {activity_name}"}
 
-    @app.middleware("http")
-    async def add_cache_control_headers(request, call_next):
-        """Add cache control headers to prevent stale content"""
-        response = await call_next(request)
-        
-        # Disable caching for API endpoints and static files
-        if request.url.path.startswith("/static/") or request.url.path.startswith("/activities"):
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-        
-        return response
\ No newline at end of file
+
+@app.delete("/activities/{activity_name}/remove")
+async def remove_from_activity(activity_name: ActivityName, email: EmailStr):
+    """Remove a participant from an activity"""
+    async with _signup_lock:
+        return _do_remove(activity_name, sys.intern(email))
+
+
+@app.middleware("http")
+async def add_cache_control_headers(request, call_next):
+    """Add cache control headers to static assets and API responses"""
+    response = await call_next(request)
+    path = request.url.path
+
+    if path.startswith("/static/"):
+        # Static assets are not fingerprinted, so browsers must revalidate them
+        # with their ETag; unchanged files are answered with a bodiless 304
+        response.headers["Cache-Control"] = "no-cache"
+    elif path.startswith("/activities"):
+        # Disable caching for API endpoints to prevent stale content
+        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+        response.headers["Pragma"] = "no-cache"
+        response.headers["Expires"] = "0"
+
+    return response
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # Participant data and the signup lock live in this process, so keep a
+    # single worker; uvicorn picks uvloop and httptools when they are installed
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto",
+                timeout_keep_alive=30)
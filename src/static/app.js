@@ -84,7 +84,7 @@ document.addEventListener("DOMContentLoaded", () => {
           // Refresh activities list
           await fetchActivities();
         } else {
-          messageDiv.textContent = result.detail || "An error occurred";
+          messageDiv.textContent = typeof result.detail === "string" ? result.detail : "An error occurred";
           messageDiv.className = "error";
         }
 
@@ -127,7 +127,7 @@ document.addEventListener("DOMContentLoaded", () => {
         // Refresh activities list to show new participant
         await fetchActivities();
       } else {
-        messageDiv.textContent = result.detail || "An error occurred";
+        messageDiv.textContent = typeof result.detail === "string" ? result.detail : "An error occurred";
         messageDiv.className = "error";
       }
 
@@ -2,6 +2,7 @@
 Tests for the Mergington High School Activities API
 """
 
+import pickle
 import pytest
 from fastapi.testclient import TestClient
 import sys
@@ -10,7 +11,18 @@ from pathlib import Path
 # Add src directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from app import app, activities
+from app import (
+    app,
+    activities,
+    MAX_BATCH_SIZE,
+    _first_same_category,
+    _intern_activities,
+    _rebuild_indexes,
+    student_has_activity_in_category,
+)
+
+# Snapshot of the initial activities, restored after every test
+_SNAPSHOT = pickle.dumps(activities)
 
 
 @pytest.fixture
@@ -21,24 +33,13 @@ def client():
 
 @pytest.fixture(autouse=True)
 def reset_activities():
-    """Reset activities data before each test"""
-    # Store original state
-    original_activities = {
-        name: {
-            "description": details["description"],
-            "schedule": details["schedule"],
-            "max_participants": details["max_participants"],
-            "participants": details["participants"].copy()
-        }
-        for name, details in activities.items()
-    }
-    
+    """Reset activities data after each test"""
     yield
     
     # Restore original state after test
-    for name, details in original_activities.items():
-        if name in activities:
-            activities[name]["participants"] = details["participants"].copy()
+    activities.clear()
+    activities.update(_intern_activities(pickle.loads(_SNAPSHOT)))
+    _rebuild_indexes()
 
 
 class TestRootEndpoint:
@@ -50,6 +51,78 @@ class TestRootEndpoint:
         assert response.status_code == 307
         assert response.headers["location"] == "/static/index.html"
 
+    def test_root_redirect_repeatable(self, client):
+        """Test that the shared redirect response can be served repeatedly"""
+        for _ in range(3):
+            response = client.get("/", follow_redirects=False)
+            assert response.status_code == 307
+            assert response.headers["location"] == "/static/index.html"
+
+
+class TestCacheHeaders:
+    """Tests for the Cache-Control middleware"""
+
+    def test_static_asset_revalidated(self, client):
+        """Test that unfingerprinted static assets must be revalidated"""
+        response = client.get("/static/app.js")
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-cache"
+        assert "etag" in response.headers
+
+    def test_static_asset_etag_not_modified(self, client):
+        """Test that a matching If-None-Match returns 304 without a body"""
+        response = client.get("/static/index.html")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        cached = client.get("/static/index.html", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+    def test_static_asset_head(self, client):
+        """Test that HEAD on a static asset returns headers without a body"""
+        get_response = client.get("/static/index.html", headers={"Accept-Encoding": "identity"})
+        response = client.head("/static/index.html")
+        assert response.status_code == 200
+        assert response.content == b""
+        assert response.headers["etag"] == get_response.headers["etag"]
+        assert response.headers["content-length"] == str(len(get_response.content))
+
+    def test_static_asset_bodiless_responses_vary(self, client):
+        """Test that HEAD and 304 responses vary on Accept-Encoding like GET"""
+        get_response = client.get("/static/index.html", headers={"Accept-Encoding": "gzip"})
+        assert get_response.headers["vary"] == "Accept-Encoding"
+
+        head_response = client.head("/static/index.html", headers={"Accept-Encoding": "gzip"})
+        assert head_response.headers["vary"] == "Accept-Encoding"
+
+        cached = client.get(
+            "/static/index.html",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": get_response.headers["etag"]},
+        )
+        assert cached.status_code == 304
+        assert cached.headers["vary"] == "Accept-Encoding"
+
+    def test_static_asset_if_none_match_star(self, client):
+        """Test that If-None-Match: * matches any cached static asset"""
+        response = client.get("/static/app.js", headers={"If-None-Match": "*"})
+        assert response.status_code == 304
+
+    def test_static_asset_etag_is_weak(self, client):
+        """Test that the static ETag is weak since gzip may change the body"""
+        response = client.get("/static/styles.css")
+        assert response.headers["etag"].startswith('W/"')
+
+    def test_static_asset_missing(self, client):
+        """Test that unknown static paths return 404"""
+        response = client.get("/static/missing.js")
+        assert response.status_code == 404
+
+    def test_activities_not_cached(self, client):
+        """Test that the activities API disables caching"""
+        response = client.get("/activities")
+        assert response.headers["cache-control"] == "no-cache, no-store, must-revalidate"
+
 
 class TestGetActivities:
     """Tests for GET /activities endpoint"""
@@ -63,6 +136,13 @@ class TestGetActivities:
         assert "Chess Club" in data
         assert "Programming Class" in data
         
+    def test_activities_gzip(self, client):
+        """Test that the activities payload is gzip compressed when accepted"""
+        response = client.get("/activities", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Chess Club" in response.json()
+        
     def test_activities_structure(self, client):
         """Test that activities have correct structure"""
         response = client.get("/activities")
@@ -76,6 +156,29 @@ class TestGetActivities:
             assert isinstance(details["participants"], list)
 
 
+class TestActivitiesOverlap:
+    """Tests for GET /activities/overlap endpoint"""
+
+    def test_overlap_counts_shared_students(self, client):
+        """Test that overlap reflects students enrolled in both activities"""
+        response = client.get("/activities/overlap?a=Chess Club&b=Programming Class")
+        assert response.status_code == 200
+        assert response.json()["overlap"] == 0
+
+        client.post("/activities/Programming Class/signup?email=michael@mergington.edu")
+        response = client.get("/activities/overlap?a=Chess Club&b=Programming Class")
+        assert response.json()["overlap"] == 1
+
+        client.delete("/activities/Chess Club/remove?email=michael@mergington.edu")
+        response = client.get("/activities/overlap?a=Chess Club&b=Programming Class")
+        assert response.json()["overlap"] == 0
+
+    def test_overlap_unknown_activity(self, client):
+        """Test that overlap rejects unknown activity names"""
+        response = client.get("/activities/overlap?a=Chess Club&b=Fake Club")
+        assert response.status_code == 422
+
+
 class TestSignupForActivity:
     """Tests for POST /activities/{activity_name}/signup endpoint"""
     
@@ -116,9 +219,63 @@ class TestSignupForActivity:
         response = client.post(
             "/activities/Nonexistent Club/signup?email=test@mergington.edu"
         )
-        assert response.status_code == 404
-        assert "Activity not found" in response.json()["detail"]
+        assert response.status_code == 422
+
+    def test_signup_invalid_email(self, client):
+        """Test signing up with a malformed email address"""
+        response = client.post(
+            "/activities/Book Club/signup?email=not-an-email"
+        )
+        assert response.status_code == 422
+    
+    def test_signup_more_than_three_activities(self, client):
+        """Test that a student cannot enroll in more than 3 activities"""
+        email = "busy@mergington.edu"
+
+        for activity in ["Chess Club", "Programming Class", "Art Club"]:
+            response = client.post(
+                f"/activities/{activity}/signup?email={email}"
+            )
+            assert response.status_code == 200
+
+        response = client.post(
+            f"/activities/Debate Team/signup?email={email}"
+        )
+        assert response.status_code == 400
+        assert "3 activities" in response.json()["detail"]
+
+    def test_signup_after_remove_frees_category(self, client):
+        """Test that removing a student allows signing up in the same category"""
+        email = "lily@mergington.edu"
+
+        response = client.post(
+            f"/activities/Drama Club/signup?email={email}"
+        )
+        assert response.status_code == 400
+
+        client.delete(f"/activities/Art Club/remove?email={email}")
+        response = client.post(
+            f"/activities/Drama Club/signup?email={email}"
+        )
+        assert response.status_code == 200
     
+    def test_signup_activity_full(self, client):
+        """Test that signups are rejected once an activity reaches capacity"""
+        activity = "Chess Club"
+        spots_left = activities[activity].max_participants - len(activities[activity].participants)
+
+        for i in range(spots_left):
+            response = client.post(
+                f"/activities/{activity}/signup?email=player{i}@mergington.edu"
+            )
+            assert response.status_code == 200
+
+        response = client.post(
+            f"/activities/{activity}/signup?email=latecomer@mergington.edu"
+        )
+        assert response.status_code == 400
+        assert "Activity full" in response.json()["detail"]
+
     def test_signup_special_characters_in_name(self, client):
         """Test signup with URL-encoded activity name"""
         response = client.post(
@@ -127,6 +284,84 @@ class TestSignupForActivity:
         assert response.status_code == 200
 
 
+class TestBatchSignup:
+    """Tests for POST /activities/signup/batch endpoint"""
+
+    def test_batch_signup_mixed_results(self, client):
+        """Test that each item in a batch reports its own result"""
+        response = client.post(
+            "/activities/signup/batch",
+            json=[
+                {"activity_name": "Book Club", "email": "batch1@mergington.edu"},
+                {"activity_name": "Book Club", "email": "batch1@mergington.edu"},
+                {"activity_name": "Fake Club", "email": "batch2@mergington.edu"},
+                {"activity_name": "Chess Club", "email": "batch2@mergington.edu"},
+            ],
+        )
+        assert response.status_code == 207
+        results = response.json()
+        assert [r["ok"] for r in results] == [True, False, False, True]
+        assert [r["index"] for r in results] == [0, 1, 2, 3]
+        assert "already signed up" in results[1]["detail"]
+        assert "Activity not found" in results[2]["detail"]
+
+        activities_data = client.get("/activities").json()
+        assert "batch1@mergington.edu" in activities_data["Book Club"]["participants"]
+        assert "batch2@mergington.edu" in activities_data["Chess Club"]["participants"]
+
+    def test_batch_signup_invalid_email(self, client):
+        """Test that malformed emails are rejected per item"""
+        response = client.post(
+            "/activities/signup/batch",
+            json=[
+                {"activity_name": "Book Club", "email": "not an email"},
+                {"activity_name": "Book Club", "email": ""},
+            ],
+        )
+        assert response.status_code == 207
+        results = response.json()
+        assert [r["ok"] for r in results] == [False, False]
+        assert all("Invalid email" in r["detail"] for r in results)
+        assert activities["Book Club"].participants == set()
+
+    def test_batch_signup_normalizes_email(self, client):
+        """Test that mixed-case domains map to the same student on every path"""
+        response = client.post(
+            "/activities/Art Club/signup?email=Foo@mergington.edu"
+        )
+        assert response.status_code == 200
+
+        response = client.post(
+            "/activities/signup/batch",
+            json=[{"activity_name": "Drama Club", "email": "Foo@MERGINGTON.EDU"}],
+        )
+        result = response.json()[0]
+        assert result["ok"] is False
+        assert "same category" in result["detail"]
+
+        response = client.post(
+            "/activities/signup/batch",
+            json=[{"activity_name": "Chess Club", "email": "Foo@MERGINGTON.EDU"}],
+        )
+        assert response.json()[0]["ok"] is True
+
+        response = client.delete(
+            "/activities/Chess Club/remove?email=Foo@MeRgInGtOn.EdU"
+        )
+        assert response.status_code == 200
+        assert "Foo@mergington.edu" not in activities["Chess Club"].participants
+
+    def test_batch_signup_too_large(self, client):
+        """Test that batches over the size limit are rejected without changes"""
+        items = [
+            {"activity_name": "Book Club", "email": f"bulk{i}@mergington.edu"}
+            for i in range(MAX_BATCH_SIZE + 1)
+        ]
+        response = client.post("/activities/signup/batch", json=items)
+        assert response.status_code == 422
+        assert activities["Book Club"].participants == set()
+
+
 class TestRemoveFromActivity:
     """Tests for DELETE /activities/{activity_name}/remove endpoint"""
     
@@ -166,8 +401,37 @@ class TestRemoveFromActivity:
         response = client.delete(
             "/activities/Fake Club/remove?email=test@mergington.edu"
         )
-        assert response.status_code == 404
-        assert "Activity not found" in response.json()["detail"]
+        assert response.status_code == 422
+
+
+class TestInterning:
+    """Tests for interned activity names and participant emails"""
+
+    def test_restored_state_is_interned(self):
+        """Test that names and emails stay interned after the fixture restores them"""
+        for name, details in activities.items():
+            assert name is sys.intern(name)
+            for email in details.participants:
+                assert email is sys.intern(email)
+
+
+class TestCategoryHelpers:
+    """Tests for the per-student category lookup helpers"""
+
+    def test_student_has_activity_in_category(self, client):
+        """Test category membership for enrolled and unknown students"""
+        assert student_has_activity_in_category("michael@mergington.edu", "Sports")
+        assert not student_has_activity_in_category("michael@mergington.edu", "Arts")
+        assert not student_has_activity_in_category("nobody@mergington.edu", "Sports")
+
+        client.delete("/activities/Chess Club/remove?email=michael@mergington.edu")
+        assert not student_has_activity_in_category("michael@mergington.edu", "Sports")
+
+    def test_first_same_category(self, client):
+        """Test finding the enrolled activity that shares a category"""
+        assert _first_same_category("lily@mergington.edu", "Arts") == "Art Club"
+        assert _first_same_category("lily@mergington.edu", "STEM") is None
+        assert _first_same_category("nobody@mergington.edu", "Arts") is None
 
 
 class TestIntegration: